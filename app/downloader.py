@@ -1,51 +1,81 @@
 from yt_dlp import YoutubeDL
 import os
+import time
+import shutil
 from app.logger import get_logger
+from app.fscache import warm_file_cache
 import imageio_ffmpeg
 
 logger = get_logger(__name__)
 
-def progress_hook(d):
-    if d.get("status") == "downloading":
-        total = d.get("total_bytes") or d.get("total_bytes_estimate")
-        downloaded = d.get("downloaded_bytes", 0)
-        if total:
-            percent = downloaded / total * 100
-            logger.info("Downloading: %.2f%% complete", percent)
-        else:
-            logger.info("Downloading: %d bytes", downloaded)
-    elif d.get("status") == "finished":
-        logger.info("Download finished, now post-processing...")
-
-def download_video(video_id, 
-                   output_folder="downloads", 
-                   cookies_path="cookies.txt", 
-                   use_cookies_from_browser=True,
-                   visitor_data=None):
-    url = f"https://www.youtube.com/watch?v={video_id}"
-    logger.info("Downloading video from URL: %s", url)
-    
-    os.makedirs(output_folder, exist_ok=True)
-    
-    # Use a format that downloads the best video and best audio streams separately,
-    # then merges them into an MP4 container (requires ffmpeg).
+# Resolved once per process; get_ffmpeg_exe scans PATH and can hit disk.
+_FFMPEG_PATH = imageio_ffmpeg.get_ffmpeg_exe()
+
+def _make_progress_hook(min_interval=1.0):
+    """
+    Returns a progress hook that logs at most once per min_interval seconds.
+    yt-dlp fires the hook many times per second per fragment; formatting and
+    emitting a log line for each one is measurable CPU on fast downloads.
+    """
+    last_ts = [0.0]
+
+    def progress_hook(d):
+        status = d.get("status")
+        if status == "downloading":
+            now = time.monotonic()
+            if now - last_ts[0] < min_interval:
+                return
+            last_ts[0] = now
+            total = d.get("total_bytes") or d.get("total_bytes_estimate")
+            downloaded = d.get("downloaded_bytes", 0)
+            if total:
+                percent = downloaded / total * 100
+                logger.info("Downloading: %.2f%% complete", percent)
+            else:
+                logger.info("Downloading: %d bytes", downloaded)
+        elif status == "finished":
+            logger.info("Download finished, now post-processing...")
+
+    return progress_hook
+
+def _build_ydl_opts(output_folder,
+                    cookies_path="cookies.txt",
+                    use_cookies_from_browser=True,
+                    visitor_data=None):
+    # Download the best streams up to 1080p-class. Shorts are vertical
+    # (1080x1920), so the cap goes on width: anything wider is a 4K-class
+    # source that gets downscaled anyway. Prefer mp4/m4a so the merge is a
+    # remux rather than a transcode.
     ydl_opts = {
         'outtmpl': os.path.join(output_folder, '%(id)s.%(ext)s'),
-        'format': 'bestvideo+bestaudio/best',
+        'format': 'bestvideo[width<=1080][ext=mp4]+bestaudio[ext=m4a]/best[width<=1080]/best',
         'merge_output_format': 'mp4',  # Ensures the final file is in MP4 format
         'noplaylist': True,
-        'progress_hooks': [progress_hook],
-        'quiet': False,
-        'no_warnings': False,
+        'progress_hooks': [_make_progress_hook()],
+        'quiet': True,
+        'no_warnings': True,
+        'noprogress': True,
+        # Fetch DASH fragments in parallel instead of one at a time over a
+        # single connection; CDN edges are usually per-connection limited.
+        'concurrent_fragment_downloads': 8,
+        'http_chunk_size': 10 * 1024 * 1024,
     }
-    
-    # Set ffmpeg_location using imageio-ffmpeg
-    ffmpeg_path = imageio_ffmpeg.get_ffmpeg_exe()
-    ydl_opts['ffmpeg_location'] = ffmpeg_path
-    logger.info("Using ffmpeg binary from: %s", ffmpeg_path)
+
+    # If aria2c is installed, use it for multi-connection sharding.
+    if shutil.which('aria2c'):
+        ydl_opts['external_downloader'] = 'aria2c'
+        ydl_opts['external_downloader_args'] = {
+            'aria2c': ['-x', '16', '-s', '16', '-k', '1M'],
+        }
+        logger.info("Using aria2c as external downloader.")
+
+    # Set ffmpeg_location using imageio-ffmpeg (resolved once at import)
+    ydl_opts['ffmpeg_location'] = _FFMPEG_PATH
+    logger.info("Using ffmpeg binary from: %s", _FFMPEG_PATH)
     
     # Option A: Use cookies from file if found
     if cookies_path and os.path.exists(cookies_path) and os.path.getsize(cookies_path) > 0:
+        warm_file_cache(cookies_path)  # yt-dlp re-reads this file each run
         ydl_opts['cookiefile'] = cookies_path
         logger.info("Using cookies from file: %s", cookies_path)
     
@@ -66,7 +96,57 @@ def download_video(video_id,
             'skip': 'webpage',
         }
         logger.info("Using provided visitor data for authentication.")
-    
+
+    return ydl_opts
+
+class Downloader:
+    """
+    Reusable downloader holding one YoutubeDL instance for its lifetime.
+
+    Constructing YoutubeDL per video rebuilds the extractor registry
+    (~2000 classes), recompiles its regexes and — with cookiesfrombrowser —
+    re-decrypts the Chrome cookie DB in a subprocess every call. A batch of
+    downloads through one instance pays those costs once.
+    """
+
+    def __init__(self,
+                 output_folder="downloads",
+                 cookies_path="cookies.txt",
+                 use_cookies_from_browser=True,
+                 visitor_data=None):
+        self.output_folder = output_folder
+        os.makedirs(output_folder, exist_ok=True)
+        self._ydl = YoutubeDL(_build_ydl_opts(
+            output_folder, cookies_path, use_cookies_from_browser, visitor_data
+        ))
+
+    def download(self, video_id):
+        """Downloads one video; returns its path or None on failure."""
+        url = f"https://www.youtube.com/watch?v={video_id}"
+        logger.info("Downloading video from URL: %s", url)
+        try:
+            info_dict = self._ydl.extract_info(url, download=True)
+            video_path = self._ydl.prepare_filename(info_dict)
+            logger.info("Video downloaded to: %s", video_path)
+            return video_path
+        except Exception as e:
+            logger.exception("Error downloading video: %s", e)
+            return None
+
+    def close(self):
+        self._ydl.close()
+
+def download_video(video_id,
+                   output_folder="downloads",
+                   cookies_path="cookies.txt",
+                   use_cookies_from_browser=True,
+                   visitor_data=None):
+    url = f"https://www.youtube.com/watch?v={video_id}"
+    logger.info("Downloading video from URL: %s", url)
+
+    os.makedirs(output_folder, exist_ok=True)
+    ydl_opts = _build_ydl_opts(output_folder, cookies_path,
+                               use_cookies_from_browser, visitor_data)
     try:
         with YoutubeDL(ydl_opts) as ydl:
             info_dict = ydl.extract_info(url, download=True)
@@ -0,0 +1,54 @@
+# app/fscache.py
+import os
+import mmap
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+def warm_file_cache(path):
+    """
+    Maps a file read-only and asks the kernel to fault it in, so subsequent
+    reads (usually by an ffmpeg or yt-dlp subprocess that only accepts a
+    path) come from the warm page cache instead of cold storage.
+
+    Returns True if the file was warmed; silently no-ops on platforms
+    without madvise and on missing or empty files.
+    """
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return False
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, "madvise"):
+                    mapped.madvise(mmap.MADV_WILLNEED)
+                else:
+                    # No madvise (e.g. Windows): touch one byte per page.
+                    for offset in range(0, size, mmap.PAGESIZE):
+                        mapped[offset]
+        return True
+    except (OSError, ValueError) as e:
+        logger.debug("Could not warm cache for %s: %s", path, e)
+        return False
+
+def advise_sequential(path):
+    """
+    Tells the kernel the file will be read sequentially from start to end
+    (POSIX_FADV_SEQUENTIAL doubles the readahead window, WILLNEED starts
+    it immediately), so an uploader streaming the file in large chunks
+    never stalls on a cold page-cache read. No-ops where posix_fadvise is
+    unavailable (e.g. macOS, Windows).
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+        return True
+    except OSError as e:
+        logger.debug("Could not advise readahead for %s: %s", path, e)
+        return False
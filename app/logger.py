@@ -1,16 +1,29 @@
 # app/logger.py
 import logging
+import os
+
+# Nothing in our log format uses thread, process or source-file info, so
+# skip the sys._getframe walk and os lookups logging does per record.
+logging.logThreads = False
+logging.logProcesses = False
+logging._srcfile = None
+
+_LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
 
 def get_logger(name=__name__):
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
-    # Create console handler with a higher log level
+    # Already configured (the module is imported by every other file, so this
+    # runs several times per process); don't stack duplicate handlers.
+    if logger.handlers:
+        return logger
+    logger.setLevel(_LOG_LEVEL)
     ch = logging.StreamHandler()
-    ch.setLevel(logging.DEBUG)
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    ch.setFormatter(formatter)
-    if not logger.handlers:
-        logger.addHandler(ch)
+    ch.setLevel(_LOG_LEVEL)
+    if _LOG_LEVEL == "DEBUG":
+        fmt = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    else:
+        # %(asctime)s costs a strftime per record; only pay for it in DEBUG.
+        fmt = '%(name)s - %(levelname)s - %(message)s'
+    ch.setFormatter(logging.Formatter(fmt))
+    logger.addHandler(ch)
     return logger
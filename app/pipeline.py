@@ -0,0 +1,77 @@
+# app/pipeline.py
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from app.logger import get_logger
+from app.downloader import download_video
+from app.editor import add_feedback_template
+from app.stats import get_video_metadata, save_video_metadata
+
+logger = get_logger(__name__)
+
+def _download_one(video_id, output_folder):
+    """Downloads one video plus its metadata sidecar; returns the video path or None."""
+    path = download_video(video_id, output_folder=output_folder)
+    if not path:
+        return None
+    metadata = get_video_metadata(video_id)
+    if metadata:
+        save_video_metadata(video_id, metadata, output_dir=os.path.dirname(path))
+    else:
+        logger.error("Failed to fetch metadata for video %s", video_id)
+    return path
+
+def process_batch(video_ids, max_workers=None, output_folder="downloads"):
+    """
+    Downloads and edits a batch of videos in parallel.
+
+    Downloads (and metadata fetches) are I/O-bound and run on a thread pool;
+    edits are CPU-bound ffmpeg encodes and run on a process pool so each
+    encode gets its own cores. max_workers defaults to half the core count
+    so concurrent encodes don't oversubscribe the sliced-thread encoder.
+
+    Args:
+        video_ids (list): YouTube video IDs to process.
+        max_workers (int): Parallelism for each stage; defaults to cpu_count // 2.
+        output_folder (str): Folder for downloads and edited outputs.
+
+    Returns:
+        dict: Mapping of video_id to the edited video path, or None on failure.
+    """
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 2) // 2)
+
+    results = {}
+
+    downloads = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(_download_one, vid, output_folder): vid
+            for vid in video_ids
+        }
+        for future in as_completed(futures):
+            vid = futures[future]
+            try:
+                downloads[vid] = future.result()
+            except Exception as e:
+                logger.exception("Download failed for %s: %s", vid, e)
+                downloads[vid] = None
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for vid, path in downloads.items():
+            if not path:
+                logger.error("Skipping edit for %s: download failed", vid)
+                results[vid] = None
+                continue
+            edited = os.path.join(output_folder, f"edited_{os.path.basename(path)}")
+            futures[pool.submit(add_feedback_template, path, edited)] = vid
+        for future in as_completed(futures):
+            vid = futures[future]
+            try:
+                results[vid] = future.result()
+            except Exception as e:
+                logger.exception("Edit failed for %s: %s", vid, e)
+                results[vid] = None
+
+    return results
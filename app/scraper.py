@@ -4,15 +4,25 @@ from app.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Compiled once at import so hot loops skip re.compile's cache lookup.
+_SHORTS_RE = re.compile(r"shorts/([^/?&]+)")
+
+def match_video_id(url):
+    """
+    Return the video ID from a YouTube Shorts URL, or None. Unlike
+    extract_video_id this never logs, so it is safe inside tight polling
+    predicates.
+    """
+    match = _SHORTS_RE.search(url)
+    return match.group(1) if match else None
+
 def extract_video_id(url):
     """
     Extract the video ID from a YouTube Shorts URL.
     Example URL: https://www.youtube.com/shorts/RVh0pQyM-gs
     """
-    pattern = r"shorts/([^/?&]+)"
-    match = re.search(pattern, url)
-    if match:
-        video_id = match.group(1)
+    video_id = match_video_id(url)
+    if video_id:
         logger.info("Extracted video ID: %s", video_id)
         return video_id
     else:
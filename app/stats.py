@@ -1,5 +1,9 @@
 import os
 import json
+try:
+    import orjson  # ~5x faster serializer, emits bytes directly
+except ImportError:
+    orjson = None
 from googleapiclient.discovery import build
 from google.oauth2.credentials import Credentials
 from app.logger import get_logger
@@ -9,11 +13,22 @@ logger = get_logger(__name__)
 # IMPORTANT: Ensure token.json is generated via the OAuth2 flow using your credentials.json.
 SCOPES_READ = ["https://www.googleapis.com/auth/youtube.readonly"]
 
+# Directories we've already created this process; saves a stat per save call.
+_CREATED_DIRS = set()
+
+# Built once per process; rebuilding re-reads token.json and re-fetches the
+# API discovery document on every call.
+_YOUTUBE_SERVICE = None
+
 def get_youtube_service():
     """
     Authenticate and return the YouTube API service for read-only operations.
     Expects a valid token.json (created via an OAuth2 flow) to exist.
+    The service handle is cached for the lifetime of the process.
     """
+    global _YOUTUBE_SERVICE
+    if _YOUTUBE_SERVICE is not None:
+        return _YOUTUBE_SERVICE
     creds = None
     token_file = "token.json"
     if os.path.exists(token_file):
@@ -25,38 +40,86 @@ def get_youtube_service():
     if not creds or not creds.valid:
         logger.error("No valid credentials found for YouTube API. Please run generate_token.py locally!")
         return None
-    return build("youtube", "v3", credentials=creds)
+    _YOUTUBE_SERVICE = build(
+        "youtube", "v3", credentials=creds,
+        cache_discovery=False, static_discovery=True
+    )
+    return _YOUTUBE_SERVICE
+
+def get_videos_bulk(video_ids):
+    """
+    Fetches statistics and metadata for many videos in as few API calls as
+    possible. The videos.list endpoint accepts both parts and up to 50
+    comma-separated IDs per request, so N videos cost ceil(N / 50) round
+    trips instead of 2 * N.
+
+    Args:
+        video_ids (list): The YouTube video IDs.
+
+    Returns:
+        dict: Mapping of video_id to {"stats": {...}, "metadata": {...}}.
+              IDs the API did not return are absent from the result.
+    """
+    youtube = get_youtube_service()
+    if not youtube:
+        return {}
+
+    results = {}
+    for start in range(0, len(video_ids), 50):
+        chunk = video_ids[start:start + 50]
+        request = youtube.videos().list(
+            part="snippet,statistics",
+            id=",".join(chunk)
+        )
+        response = request.execute()
+        for item in response.get("items", []):
+            video_id = item.get("id")
+            statistics = item.get("statistics", {})
+            snippet = item.get("snippet", {})
+            results[video_id] = {
+                "stats": {
+                    "views": int(statistics.get("viewCount", 0)),
+                    "likes": int(statistics.get("likeCount", 0)),
+                    "comments": int(statistics.get("commentCount", 0))
+                },
+                "metadata": {
+                    "title": snippet.get("title", f"Viral Short: {video_id}"),
+                    "description": snippet.get("description", f"This is a viral YouTube Short with ID {video_id}. Enjoy the video!"),
+                    "tags": snippet.get("tags", ["shorts", "viral", "trending"])
+                }
+            }
+    logger.info("Fetched %d of %d videos in bulk", len(results), len(video_ids))
+    return results
+
+def get_video_stats_batch(video_ids):
+    """
+    Fetches statistics for many videos in one round-trip per 50 IDs.
+
+    Args:
+        video_ids (list): The YouTube video IDs.
+
+    Returns:
+        dict: Mapping of video_id to its stats dict; IDs the API did not
+              return are absent.
+    """
+    return {vid: info["stats"] for vid, info in get_videos_bulk(video_ids).items()}
 
 def get_video_stats(video_id):
     """
     Fetches real video statistics from YouTube API for the given video ID.
-    
+
     Args:
         video_id (str): The YouTube video ID.
-        
+
     Returns:
         dict: A dictionary containing viewCount, likeCount, and commentCount as integers,
               or None if the video was not found.
     """
-    youtube = get_youtube_service()
-    if not youtube:
-        return None
-
-    request = youtube.videos().list(
-        part="statistics",
-        id=video_id
-    )
-    response = request.execute()
-    items = response.get("items", [])
-    if not items:
+    result = get_videos_bulk([video_id]).get(video_id)
+    if not result:
         logger.error("No video found for ID: %s", video_id)
         return None
-    statistics = items[0].get("statistics", {})
-    stats = {
-        "views": int(statistics.get("viewCount", 0)),
-        "likes": int(statistics.get("likeCount", 0)),
-        "comments": int(statistics.get("commentCount", 0))
-    }
+    stats = result["stats"]
     logger.info("Fetched stats for video %s: %s", video_id, stats)
     return stats
 
@@ -94,45 +157,46 @@ def get_video_metadata(video_id):
     Returns:
         dict: A dictionary with keys "title", "description", and "tags", or None if the video was not found.
     """
-    youtube = get_youtube_service()
-    if not youtube:
-        return None
-
-    request = youtube.videos().list(
-        part="snippet",
-        id=video_id
-    )
-    response = request.execute()
-    items = response.get("items", [])
-    if not items:
+    result = get_videos_bulk([video_id]).get(video_id)
+    if not result:
         logger.error("No video found for ID: %s", video_id)
         return None
-    snippet = items[0].get("snippet", {})
-    metadata = {
-        "title": snippet.get("title", f"Viral Short: {video_id}"),
-        "description": snippet.get("description", f"This is a viral YouTube Short with ID {video_id}. Enjoy the video!"),
-        "tags": snippet.get("tags", ["shorts", "viral", "trending"])
-    }
+    metadata = result["metadata"]
     logger.info("Fetched metadata for video %s: %s", video_id, metadata)
     return metadata
 
-def save_video_metadata(video_id, metadata, output_dir="downloads"):
+def save_video_metadata(video_id, metadata, output_dir="downloads", output_path=None):
     """
     Saves video metadata as a JSON file with the same base name as the video.
-    
+
     Args:
         video_id (str): The ID of the video.
         metadata (dict): Metadata containing title, description, and tags.
         output_dir (str): Directory where the JSON file will be saved.
-        
+        output_path (str): Optional explicit file path; overrides
+            output_dir/video_id so callers can write the sidecar exactly
+            where a consumer expects it, without a copy step.
+
     Returns:
         str: The path to the saved metadata file.
     """
-    os.makedirs(output_dir, exist_ok=True)
-    metadata_file = os.path.join(output_dir, f"{video_id}.json")
+    if output_path is not None:
+        metadata_file = output_path
+        output_dir = os.path.dirname(output_path) or "."
+    else:
+        metadata_file = os.path.join(output_dir, f"{video_id}.json")
+    if output_dir not in _CREATED_DIRS:
+        os.makedirs(output_dir, exist_ok=True)
+        _CREATED_DIRS.add(output_dir)
     try:
-        with open(metadata_file, "w") as f:
-            json.dump(metadata, f)
+        if orjson is not None:
+            payload = orjson.dumps(metadata)
+        else:
+            payload = json.dumps(metadata).encode()
+        # Serialize first, then one binary write: single syscall, no text
+        # encoder in the loop.
+        with open(metadata_file, "wb") as f:
+            f.write(payload)
         logger.info("Saved metadata to %s", metadata_file)
     except Exception as e:
         logger.exception("Error saving metadata: %s", e)
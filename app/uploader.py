@@ -1,58 +1,155 @@
 import os
 import json
-from datetime import datetime, timedelta
+try:
+    import orjson  # ~5x faster serializer, emits bytes directly
+except ImportError:
+    orjson = None
+import time
+import pathlib
+import hashlib
+import queue
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from dateutil import parser
 
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
-from datetime import datetime, timedelta, timezone
-from dateutil import parser
+from googleapiclient.errors import HttpError
 import requests  # Needed for Instagram API calls
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
 from urllib.parse import urlparse
 
 from app.logger import get_logger
+from app.fscache import advise_sequential
 
 logger = get_logger(__name__)
 SCOPES = ["https://www.googleapis.com/auth/youtube.upload"]
 
+# One pooled session for every Facebook/Instagram Graph call: reusing the
+# connection saves a TCP+TLS handshake on each of the 2-3 calls per upload,
+# and transient 429/5xx responses retry with backoff instead of failing the
+# whole publish. The User-Agent is set once so the header dict isn't rebuilt
+# per request.
+_FB_SESSION = requests.Session()
+_FB_SESSION.headers["User-Agent"] = "shortbuilderai/1.0"
+_FB_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4, pool_maxsize=8,
+    # Default allowed_methods keeps POSTs (container create / publish)
+    # un-retried on status codes — retrying those could double-publish.
+    max_retries=Retry(total=3, backoff_factor=0.3,
+                      status_forcelist=(429, 500, 502, 503, 504)),
+))
+_FB_TIMEOUT = 30  # seconds; Graph calls should never hang indefinitely
+
+def _response_json(response):
+    """
+    Parses a Graph response body. orjson consumes the raw bytes directly,
+    skipping requests' charset-detection and str-decode pass.
+    """
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
 #######################################################
 # INTERNAL Scheduling Logic for 2x Daily (10:00 & 18:00)
 #######################################################
-TIME_SLOTS_UTC = [10, 18]  # 10:00 and 18:00 UTC daily
+TIME_SLOTS_UTC = sorted((10, 18))  # 10:00 and 18:00 UTC daily; kept sorted for slot lookup
 SCHEDULE_FILE = "youtube_schedule.json"
+# Slots are always on whole hours; strftime with a cached format string goes
+# through the C _datetime accelerator, unlike isoformat() + str.replace.
+_ISO_FMT = "%Y-%m-%dT%H:00:00Z"
+
+def _read_json(path):
+    """
+    Reads and parses a whole JSON file in one syscall + one parse.
+    open()+json.load feeds the parser in small buffered chunks, which is
+    noticeably slower for the sub-KB config files this module reads.
+    """
+    payload = pathlib.Path(path).read_bytes()
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
 
 def _load_schedule_data():
     """
     Loads a JSON file to track the last scheduled time.
     Returns a dict: { "last_scheduled": "2025-04-03T10:00:00Z" } or None if missing.
     """
-    if not os.path.exists(SCHEDULE_FILE):
-        return None
+    # EAFP: opening directly saves the stat syscall of an exists() pre-check.
     try:
-        with open(SCHEDULE_FILE, "r") as f:
-            return json.load(f)
+        return _read_json(SCHEDULE_FILE)
+    except FileNotFoundError:
+        return None
     except Exception as e:
         logger.error("Failed to read %s: %s", SCHEDULE_FILE, e)
         return None
 
+def _write_json_atomic(path, data):
+    """
+    Serializes first and writes through a same-directory temp file, then
+    os.replace's it into place: one write syscall, and a crash mid-write can
+    never leave a truncated file behind.
+    """
+    tmp_path = path + ".tmp"
+    if orjson is not None:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        payload = json.dumps(data, indent=4).encode()
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
 def _save_schedule_data(data):
     """
     Saves scheduling info to youtube_schedule.json.
     data is typically { "last_scheduled": ... }
     """
     try:
-        with open(SCHEDULE_FILE, "w") as f:
-            json.dump(data, f, indent=4)
-    except Exception as e:
-        print(e)
+        _write_json_atomic(SCHEDULE_FILE, data)
+    except Exception:
+        logger.exception("Failed to save %s", SCHEDULE_FILE)
 
-TIME_SLOTS_UTC = [10, 18]  # 10:00 and 18:00 UTC daily
-SCHEDULE_FILE = "youtube_schedule.json"
+def _load_last_scheduled():
+    """Returns the persisted last_scheduled slot as an aware datetime, or None."""
+    schedule_data = _load_schedule_data()
+    if not schedule_data or "last_scheduled" not in schedule_data:
+        return None
+    last_str = schedule_data["last_scheduled"]
+    try:
+        # We always write the timestamp ourselves in RFC 3339 shape, so
+        # the stdlib parser handles it; it's several times faster than
+        # dateutil and keeps dateutil off the hot path.
+        return datetime.fromisoformat(last_str.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            return parser.isoparse(last_str)
+        except Exception:
+            logger.warning("Invalid last_scheduled format in %s, ignoring.", SCHEDULE_FILE)
+            return None
+
+def _next_slot_after(candidate):
+    """
+    Returns the first slot datetime strictly after 'candidate'. Slots are on
+    whole hours, so the first slot hour greater than candidate's hour
+    qualifies; when none remains today, roll to the first slot tomorrow.
+    One datetime construction, no day-by-day scanning.
+    """
+    next_hour = next((h for h in TIME_SLOTS_UTC if h > candidate.hour), None)
+    slot_date = candidate.date()
+    if next_hour is None:
+        slot_date += timedelta(days=1)
+        next_hour = TIME_SLOTS_UTC[0]
+    return datetime(slot_date.year, slot_date.month, slot_date.day,
+                    next_hour, 0, 0, tzinfo=timezone.utc)
 
 def _get_next_time_slot():
     """
@@ -62,73 +159,177 @@ def _get_next_time_slot():
 
     Returns an RFC 3339 string, e.g. "2025-04-03T10:00:00Z".
     """
-    schedule_data = _load_schedule_data()
-    # Use an *aware* datetime in UTC:
+    last_dt = _load_last_scheduled()
     now_utc = datetime.now(timezone.utc)
 
-    if schedule_data and "last_scheduled" in schedule_data:
-        last_str = schedule_data["last_scheduled"]
-        try:
-            last_dt = parser.isoparse(last_str)
-        except Exception:
-            logger.warning("Invalid last_scheduled format in %s, ignoring.", SCHEDULE_FILE)
-            last_dt = None
-    else:
-        last_dt = None
-
     # Start from whichever is later: now or last scheduled time
     if last_dt and last_dt > now_utc:
         candidate = last_dt
     else:
         candidate = now_utc
+    return _next_slot_after(candidate).strftime(_ISO_FMT)
 
-    # We want the NEXT slot after 'candidate'
-    while True:
-        candidate_date = candidate.date()
-        for hour in TIME_SLOTS_UTC:
-            # Also construct this slot time in UTC:
-            slot_dt = datetime(candidate_date.year, candidate_date.month, candidate_date.day,
-                               hour, 0, 0, tzinfo=timezone.utc)
-            if slot_dt > candidate:
-                return slot_dt.isoformat().replace("+00:00", "Z")
-        # If we didn't find a slot for that day, jump to next day at midnight UTC
-        candidate = datetime(candidate_date.year, candidate_date.month, candidate_date.day,
-                             tzinfo=timezone.utc) + timedelta(days=1)
+def _iter_next_slots(n):
+    """
+    Yields the next n slot strings for bulk scheduling. Reads the schedule
+    file once up front and persists the final slot once at the end, instead
+    of a read-modify-write round trip per video.
+    """
+    last_dt = _load_last_scheduled()
+    candidate = max(filter(None, (last_dt, datetime.now(timezone.utc))))
+    last_slot = None
+    try:
+        for _ in range(n):
+            candidate = _next_slot_after(candidate)
+            last_slot = candidate.strftime(_ISO_FMT)
+            yield last_slot
+    finally:
+        if last_slot is not None:
+            _save_schedule_data({"last_scheduled": last_slot})
+
+
+#####################################################
+# Upload Index (makes batch re-runs idempotent)
+#####################################################
+UPLOAD_INDEX_FILE = "upload_index.json"
+
+# The YouTube and Instagram uploads run concurrently and both record into
+# the same index; serialize the read-modify-write so neither entry is lost.
+_UPLOAD_INDEX_LOCK = threading.Lock()
 
+def _video_fingerprint(video_path):
+    """
+    Content hash of the first 4 MiB of the file — enough to tell
+    re-encodes apart without reading whole videos.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(video_path, "rb") as f:
+        h.update(f.read(4 * 1024 * 1024))
+    return h.hexdigest()
+
+def _get_uploaded_id(video_path, platform):
+    """Returns the stored ID if this exact video already went to platform."""
+    try:
+        index = _read_json(UPLOAD_INDEX_FILE)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error("Failed to read %s: %s", UPLOAD_INDEX_FILE, e)
+        return None
+    try:
+        return index.get(_video_fingerprint(video_path), {}).get(platform)
+    except OSError:
+        return None
+
+def _record_uploaded_id(video_path, platform, upload_id):
+    """Records a successful upload so later re-runs skip it."""
+    with _UPLOAD_INDEX_LOCK:
+        try:
+            index = _read_json(UPLOAD_INDEX_FILE)
+        except Exception:
+            index = {}
+        try:
+            index.setdefault(_video_fingerprint(video_path), {})[platform] = upload_id
+            _write_json_atomic(UPLOAD_INDEX_FILE, index)
+        except Exception as e:
+            logger.error("Failed to update %s: %s", UPLOAD_INDEX_FILE, e)
 
 #################################################
 # YOUTUBE AUTH & UPLOAD (with hidden scheduling)
 #################################################
 
+# Built once per process and keyed on token.json's mtime, so a token
+# refreshed on disk (e.g. by generate_token.py) is picked up without a
+# restart while unchanged tokens never rebuild the discovery client.
+_YT_CLIENT = None
+_YT_TOKEN_MTIME = None
+
 def authenticate_youtube():
-    creds = None
+    global _YT_CLIENT, _YT_TOKEN_MTIME
     token_file = "token.json"
-    if os.path.exists(token_file):
-        try:
-            creds = Credentials.from_authorized_user_file(token_file, SCOPES)
-        except Exception as e:
-            logger.error("Failed to load credentials from token.json: %s", e)
-            return None
+    try:
+        token_mtime = os.stat(token_file).st_mtime_ns
+    except OSError:
+        token_mtime = None
+    if _YT_CLIENT is not None and token_mtime == _YT_TOKEN_MTIME:
+        return _YT_CLIENT
+    creds = None
+    try:
+        creds = Credentials.from_authorized_user_file(token_file, SCOPES)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.error("Failed to load credentials from token.json: %s", e)
+        return None
     if not creds or not creds.valid:
         logger.error("No valid credentials found. Please run generate_token.py locally!")
         return None
-    return build("youtube", "v3", credentials=creds)
+    _YT_CLIENT = build(
+        "youtube", "v3", credentials=creds,
+        cache_discovery=False, static_discovery=True
+    )
+    _YT_TOKEN_MTIME = token_mtime
+    return _YT_CLIENT
+
+def _invalidate_youtube_client():
+    """Drops the cached client so the next upload re-authenticates."""
+    global _YT_CLIENT, _YT_TOKEN_MTIME
+    _YT_CLIENT = None
+    _YT_TOKEN_MTIME = None
+
+@functools.lru_cache(maxsize=64)
+def _load_json_cached(path, mtime_ns):
+    """
+    Parses a JSON file, memoized on (path, mtime): every small config this
+    module re-reads per upload — sidecars, credential files — costs one stat
+    on the hot path instead of an open + parse. Writers need no explicit
+    invalidation; the next read sees a fresh mtime key.
+    """
+    return _read_json(path)
+
+def _load_sidecar(video_path):
+    """
+    Loads the per-video metadata sidecar (<video>.json), cached on resolved
+    path and mtime so posting the same video to YouTube and Instagram reads
+    the file once. Returns {} when no sidecar exists.
+    """
+    path = os.path.abspath(os.path.splitext(video_path)[0] + ".json")
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    try:
+        return _load_json_cached(path, mtime_ns)
+    except Exception as e:
+        logger.error("Error reading metadata sidecar %s: %s", path, e)
+        return {}
 
-def upload_video(video_path, title="My YouTube Short", description="Auto-uploaded Shorts", tags=["shorts"], privacy="public"):
+def upload_video(video_path, title="My YouTube Short", description="Auto-uploaded Shorts", tags=None, privacy="public", metadata=None):
     """
     Uploads a video to YouTube. The call signature remains the same
     but we automatically schedule it 2x per day (10:00 UTC, 18:00 UTC).
+
+    A caller that has already loaded the metadata sidecar (e.g. a scheduler
+    posting the same file to several platforms) can pass it via `metadata`
+    to skip the sidecar lookup.
     """
+    tags = tags or ["shorts"]
     try:
+        # --- Step 0: Skip videos this process family already uploaded ---
+        existing_id = _get_uploaded_id(video_path, "youtube")
+        if existing_id:
+            logger.info("Video %s already uploaded to YouTube (ID=%s); skipping.",
+                        video_path, existing_id)
+            return existing_id
+
         # --- Step 1: Load JSON metadata if present ---
-        metadata_path = os.path.splitext(video_path)[0] + ".json"
-        if os.path.exists(metadata_path):
-            with open(metadata_path, "r") as meta_file:
-                metadata = json.load(meta_file)
+        if metadata is None:
+            metadata = _load_sidecar(video_path)
+        if metadata:
             title = metadata.get("title", title)
             description = metadata.get("description", description)
             tags = metadata.get("tags", tags)
-            logger.info("Metadata loaded from %s", metadata_path)
+            logger.info("Metadata loaded for %s", video_path)
         else:
             logger.info("No metadata file found; using default title, description, and tags.")
 
@@ -159,14 +360,31 @@ def upload_video(video_path, title="My YouTube Short", description="Auto-uploade
         }
 
         # --- Step 4: Upload (insert) via API ---
-        media = MediaFileUpload(video_path, chunksize=-1, resumable=True)
+        # An explicit chunk size streams the file from disk in 8 MiB buffers
+        # (chunksize=-1 loads the whole video into memory) and lets failed
+        # chunks resume instead of restarting the upload. The transport
+        # stays on googleapiclient's HTTP/1.1 stack: the resumable protocol
+        # acknowledges each Content-Range before the next chunk may be
+        # sent, so an HTTP/2 multiplexed client could not pipeline them
+        # anyway.
+        advise_sequential(video_path)  # readahead keeps chunk reads warm
+        media = MediaFileUpload(video_path, chunksize=8 * 1024 * 1024, resumable=True)
         logger.info("Uploading video to YouTube: %s", video_path)
         request = youtube.videos().insert(
             part="snippet,status",
             body=request_body,
             media_body=media
         )
-        response = request.execute()
+        response = None
+        last_logged = -10
+        while response is None:
+            status, response = request.next_chunk()
+            if status:
+                # Log every ~10% rather than every 8 MiB chunk.
+                percent = int(status.progress() * 100)
+                if percent - last_logged >= 10:
+                    logger.info("Upload progress: %d%%", percent)
+                    last_logged = percent
         video_id = response.get("id")
         if video_id:
             logger.info("YouTube video scheduled! ID=%s | Goes public at: %s", video_id, publish_at)
@@ -174,54 +392,98 @@ def upload_video(video_path, title="My YouTube Short", description="Auto-uploade
             # Save the chosen publish time as "last_scheduled" so the next call picks the following slot
             schedule_data = {"last_scheduled": publish_at}
             _save_schedule_data(schedule_data)
+            _record_uploaded_id(video_path, "youtube", video_id)
 
             return video_id
         else:
             logger.error("YouTube upload failed. No video ID returned.")
             return None
-    except Exception as e:
-        logger.exception("Error uploading video to YouTube: %s", e)
+    except HttpError as e:
+        if e.resp.status in (401, 403):
+            # Stale credentials; drop the cached client so the next call
+            # re-reads token.json.
+            _invalidate_youtube_client()
+        logger.exception("Error uploading video to YouTube")
+        return None
+    except Exception:
+        logger.exception("Error uploading video to YouTube")
         return None
 
 #####################################
 # Cloudinary Upload Function
 #####################################
 
-def upload_to_cloudinary(video_path):
+# Configuration state cached by file mtime; the file rarely changes, so a
+# stat is the only per-upload cost.
+_CLOUDINARY_CACHE = {"mtime": 0, "configured": False}
+
+def _init_cloudinary():
     """
-    Uploads the local video file to Cloudinary and returns a publicly accessible URL.
-    Cloudinary credentials are read from cloudinary_credentials.json.
+    Configures the cloudinary SDK from cloudinary_credentials.json,
+    re-parsing and re-calling cloudinary.config only when the file changes.
+    Returns True once the SDK is ready to upload.
     """
     credentials_file = "cloudinary_credentials.json"
-    if not os.path.exists(credentials_file):
+    try:
+        mtime = os.stat(credentials_file).st_mtime_ns
+    except OSError:
         logger.error("Cloudinary credentials file does not exist.")
+        return False
+    if mtime == _CLOUDINARY_CACHE["mtime"]:
+        return _CLOUDINARY_CACHE["configured"]
+    _CLOUDINARY_CACHE["mtime"] = mtime
+    _CLOUDINARY_CACHE["configured"] = False
+    try:
+        data = _load_json_cached(credentials_file, mtime)
+    except Exception as e:
+        logger.error("Error reading Cloudinary credentials file: %s", e)
+        return False
+    cloudinary_url_str = data.get("CLOUDINARY_URL")
+    if not cloudinary_url_str:
+        logger.error("CLOUDINARY_URL not found in cloudinary_credentials.json")
+        return False
+    # Remove the "CLOUDINARY_URL=" prefix if present
+    if cloudinary_url_str.startswith("CLOUDINARY_URL="):
+        cloudinary_url_str = cloudinary_url_str.split("=", 1)[1]
+    # Parse the Cloudinary URL to extract cloud_name, api_key, and api_secret
+    parsed = urlparse(cloudinary_url_str)
+    cloud_name = parsed.hostname
+    api_key = parsed.username
+    api_secret = parsed.password
+    if not (cloud_name and api_key and api_secret):
+        logger.error("Failed to parse Cloudinary credentials from URL: %s", cloudinary_url_str)
+        return False
+    # Configure Cloudinary with separate parameters
+    cloudinary.config(
+        cloud_name=cloud_name,
+        api_key=api_key,
+        api_secret=api_secret
+    )
+    _CLOUDINARY_CACHE["configured"] = True
+    return True
+
+def upload_to_cloudinary(video_path):
+    """
+    Uploads the local video file to Cloudinary and returns a publicly accessible URL.
+    Cloudinary credentials are read from cloudinary_credentials.json (the SDK
+    is configured once and only reconfigured when that file changes).
+    """
+    if not _init_cloudinary():
         return None
     try:
-        with open(credentials_file, "r") as f:
-            data = json.load(f)
-        cloudinary_url_str = data.get("CLOUDINARY_URL")
-        if not cloudinary_url_str:
-            logger.error("CLOUDINARY_URL not found in cloudinary_credentials.json")
-            return None
-        # Remove the "CLOUDINARY_URL=" prefix if present
-        if cloudinary_url_str.startswith("CLOUDINARY_URL="):
-            cloudinary_url_str = cloudinary_url_str.split("=", 1)[1]
-        # Parse the Cloudinary URL to extract cloud_name, api_key, and api_secret
-        parsed = urlparse(cloudinary_url_str)
-        cloud_name = parsed.hostname
-        api_key = parsed.username
-        api_secret = parsed.password
-        if not (cloud_name and api_key and api_secret):
-            logger.error("Failed to parse Cloudinary credentials from URL: %s", cloudinary_url_str)
-            return None
-        # Configure Cloudinary with separate parameters
-        cloudinary.config(
-            cloud_name=cloud_name,
-            api_key=api_key,
-            api_secret=api_secret
-        )
         logger.info("Uploading video to Cloudinary: %s", video_path)
-        result = cloudinary.uploader.upload_large(video_path, resource_type="video")
+        # Kick off kernel readahead so the SDK's buffered reads stream from
+        # the page cache while earlier chunks are on the wire.
+        advise_sequential(video_path)
+        # Files under the ~100 MB single-request threshold go through the
+        # plain upload endpoint, which skips upload_large's chunk-negotiation
+        # round trips; typical Shorts fall well under it.
+        if os.path.getsize(video_path) < 90 * 1024 * 1024:
+            result = cloudinary.uploader.upload(video_path, resource_type="video")
+        else:
+            result = cloudinary.uploader.upload_large(
+                video_path, resource_type="video", chunk_size=20_000_000
+            )
         video_url = result.get("secure_url")
         if video_url:
             logger.info("Uploaded to Cloudinary, video URL: %s", video_url)
@@ -229,8 +491,8 @@ def upload_to_cloudinary(video_path):
         else:
             logger.error("Cloudinary upload did not return a secure URL.")
             return None
-    except Exception as e:
-        logger.exception("Error uploading to Cloudinary: %s", e)
+    except Exception:
+        logger.exception("Error uploading to Cloudinary")
         return None
 
 #####################################
@@ -238,25 +500,24 @@ def upload_to_cloudinary(video_path):
 #####################################
 
 def load_instagram_credentials():
-    """Load credentials from instagram_credentials.json."""
+    """Load credentials from instagram_credentials.json (cached by mtime)."""
     credentials_file = "instagram_credentials.json"
-    if os.path.exists(credentials_file):
-        try:
-            with open(credentials_file, "r") as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error("Error reading Instagram credentials file: %s", e)
-            return None
-    else:
+    try:
+        mtime_ns = os.stat(credentials_file).st_mtime_ns
+    except OSError:
         logger.error("Instagram credentials file does not exist.")
         return None
+    try:
+        return _load_json_cached(credentials_file, mtime_ns)
+    except Exception as e:
+        logger.error("Error reading Instagram credentials file: %s", e)
+        return None
 
 def save_instagram_credentials(data):
     """Save credentials to instagram_credentials.json."""
     credentials_file = "instagram_credentials.json"
     try:
-        with open(credentials_file, "w") as f:
-            json.dump(data, f, indent=4)
+        _write_json_atomic(credentials_file, data)
     except Exception as e:
         logger.error("Error saving Instagram credentials file: %s", e)
 
@@ -282,7 +543,7 @@ def get_instagram_credentials_data():
 def exchange_for_long_lived_token(short_lived_token, app_id, app_secret):
     """
     Exchanges a short-lived token for a long-lived token using Facebook's endpoint.
-    Returns the new token if successful.
+    Returns (new_token, expires_in_seconds) if successful, (None, None) otherwise.
     """
     url = "https://graph.facebook.com/v18.0/oauth/access_token"
     params = {
@@ -291,70 +552,165 @@ def exchange_for_long_lived_token(short_lived_token, app_id, app_secret):
         "client_secret": app_secret,
         "fb_exchange_token": short_lived_token
     }
-    response = requests.get(url, params=params)
+    response = _FB_SESSION.get(url, params=params, timeout=_FB_TIMEOUT)
     if response.status_code == 200:
-        data = response.json()
+        data = _response_json(response)
         new_token = data.get("access_token")
         if new_token:
             logger.info("Successfully exchanged token for long-lived token.")
-            return new_token
+            return new_token, data.get("expires_in")
         else:
             logger.error("Exchange response did not contain a new access token: %s", data)
-            return None
+            return None, None
     else:
         logger.error("Failed to exchange token: %s", response.text)
+        return None, None
+
+# Refresh the long-lived token this long before its recorded expiry, so a
+# token never goes stale mid-run and we skip the failed-request-then-retry
+# round trip entirely.
+_TOKEN_REFRESH_MARGIN = 6 * 3600
+
+def _token_is_stale(credentials):
+    """True when the stored token is past (or within the margin of) expiry."""
+    expires_at = credentials.get("Instagram_AccessToken_ExpiresAt")
+    if not expires_at:
+        # No recorded expiry (e.g. a hand-placed token): assume it is fine
+        # and let the reactive retry path catch a genuinely expired one.
+        return False
+    return time.time() > expires_at - _TOKEN_REFRESH_MARGIN
+
+def _refresh_instagram_token(temp_token, app_id, app_secret):
+    """
+    Exchanges the temporary token for a fresh long-lived one and persists it
+    together with its absolute expiry time. Returns the new token or None.
+    """
+    new_token, expires_in = exchange_for_long_lived_token(temp_token, app_id, app_secret)
+    if not new_token:
         return None
+    credentials = load_instagram_credentials() or {}
+    credentials["Instagram_AccessToken"] = new_token
+    if expires_in:
+        credentials["Instagram_AccessToken_ExpiresAt"] = int(time.time()) + int(expires_in)
+    save_instagram_credentials(credentials)
+    return new_token
 
 #####################################
 # Instagram Upload Function
 #####################################
 
+# Graph API error codes that mean the access token itself is the problem:
+# code 190 is OAuthException for invalid/expired tokens; the subcodes cover
+# expiry (463), invalidation (467) and the session-related variants
+# (458, 460, 464). Integer membership tests are O(1) and immune to
+# Facebook rewording its error messages.
+_IG_TOKEN_ERR_CODES = frozenset({190})
+_IG_TOKEN_ERR_SUBCODES = frozenset({463, 467, 458, 460, 464})
+
+def _is_token_error(response):
+    """True when a non-200 Graph response indicates a token problem."""
+    try:
+        error_info = _response_json(response).get("error", {})
+    except Exception:
+        error_info = {}
+    if (error_info.get("code") in _IG_TOKEN_ERR_CODES
+            or error_info.get("error_subcode") in _IG_TOKEN_ERR_SUBCODES):
+        return True
+    # Fallback for responses that carry no structured codes.
+    message = (error_info.get("message") or response.text).lower()
+    return "expired" in message or "invalid" in message
+
 def handle_instagram_error(response):
     """
     Checks the Instagram API response for token-related errors.
     If the error indicates the token is expired or invalid, logs a clear message.
     """
-    try:
-        error_info = response.json().get("error", {})
-        error_message = error_info.get("message", "").lower()
-        if "expired" in error_message or "invalid" in error_message:
-            logger.error("Instagram access token appears to be expired or invalid: %s", error_message)
-    except Exception:
-        pass
+    if _is_token_error(response):
+        logger.error("Instagram access token appears to be expired or invalid: %s",
+                     response.text)
 
-def upload_instagram(video_path, caption="My Instagram Post"):
+def _wait_for_container(creation_id, token, max_attempts=10):
+    """
+    Polls the media container until Instagram reports it FINISHED, backing
+    off exponentially (0.5s, 1s, 2s... capped at 16s). Publishing a
+    container that is still processing fails, and a fixed worst-case sleep
+    wastes the common fast case. Returns the last status_code seen.
+    """
+    status_url = f"https://graph.facebook.com/v18.0/{creation_id}"
+    status = None
+    for attempt in range(max_attempts):
+        r = _FB_SESSION.get(
+            status_url,
+            params={"fields": "status_code", "access_token": token},
+            timeout=_FB_TIMEOUT,
+        )
+        if r.status_code == 200:
+            status = _response_json(r).get("status_code")
+            if status == "FINISHED":
+                return status
+            if status == "ERROR":
+                logger.error("Instagram media container %s failed processing.", creation_id)
+                return status
+        time.sleep(min(0.5 * 2 ** attempt, 16))
+    logger.warning("Container %s still not FINISHED after polling; last status: %s",
+                   creation_id, status)
+    return status
+
+def upload_instagram(video_path, caption="My Instagram Post", metadata=None):
     """
     Upload a video to Instagram using the Instagram Graph API.
     NOTE: Instagram requires the video to be hosted at a public URL.
     This function first uploads the local video file to Cloudinary to obtain a public URL.
     It then uses that URL along with credentials stored in instagram_credentials.json to
     create and publish an Instagram media container.
+
+    Pass a preloaded sidecar dict via `metadata` to skip the sidecar lookup.
+    Reusing the YouTube upload as the source is not an option: the video is
+    scheduled private until its publishAt time, and Graph's video_url needs
+    a direct, publicly fetchable file, not a watch page.
     """
     try:
-        metadata_path = os.path.splitext(video_path)[0] + ".json"
-        metadata = {}
-        if os.path.exists(metadata_path):
-            with open(metadata_path, "r") as meta_file:
-                metadata = json.load(meta_file)
+        existing_id = _get_uploaded_id(video_path, "instagram")
+        if existing_id:
+            logger.info("Video %s already uploaded to Instagram (Post ID=%s); skipping.",
+                        video_path, existing_id)
+            return existing_id
+
+        if metadata is None:
+            metadata = _load_sidecar(video_path)
+        if metadata:
             caption = metadata.get("caption", caption)
-            logger.info("Metadata loaded from %s", metadata_path)
+            logger.info("Metadata loaded for %s", video_path)
         else:
             logger.info("No metadata file found; using default caption for Instagram.")
 
-        # Instead of using a 'video_url' from metadata, upload the video to Cloudinary
-        cloudinary_url = upload_to_cloudinary(video_path)
+        # Instead of using a 'video_url' from metadata, upload the video to
+        # Cloudinary. The upload dominates wall time, so load the Instagram
+        # credentials concurrently and hide that I/O behind it.
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            cloudinary_future = pool.submit(upload_to_cloudinary, video_path)
+            credentials_future = pool.submit(get_instagram_credentials_data)
+            cloudinary_url = cloudinary_future.result()
+            token, business_id, app_id, app_secret, temp_token = credentials_future.result()
         if not cloudinary_url:
             logger.error("Failed to upload video to Cloudinary for Instagram upload.")
             return None
         # Use the Cloudinary URL as the public video URL for Instagram
         public_video_url = cloudinary_url
-
-        # Load Instagram credentials from JSON file
-        token, business_id, app_id, app_secret, temp_token = get_instagram_credentials_data()
         if not token or not business_id or not app_id or not app_secret or not temp_token:
             logger.error("Missing necessary Instagram credentials in instagram_credentials.json.")
             return None
 
+        # Refresh proactively when the stored expiry says the token is about
+        # to lapse; cheaper than burning a Graph round trip on a 400 and
+        # parsing the error to discover the same thing.
+        credentials = load_instagram_credentials() or {}
+        if _token_is_stale(credentials):
+            logger.info("Stored Instagram token is near expiry; refreshing proactively.")
+            refreshed = _refresh_instagram_token(temp_token, app_id, app_secret)
+            if refreshed:
+                token = refreshed
+
         # Helper function: create media container with a given token
         def create_media_container(token_to_use):
             create_url = f"https://graph.facebook.com/v18.0/{business_id}/media"
@@ -364,21 +720,15 @@ def upload_instagram(video_path, caption="My Instagram Post"):
                 "access_token": token_to_use
             }
             logger.info("Creating Instagram media container...")
-            return requests.post(create_url, data=payload)
+            return _FB_SESSION.post(create_url, data=payload, timeout=_FB_TIMEOUT)
 
         # First attempt using the current token
         r = create_media_container(token)
         if r.status_code != 200:
-            error_info = r.json().get("error", {})
-            error_message = error_info.get("message", "").lower()
-            if "expired" in error_message or "invalid" in error_message:
+            if _is_token_error(r):
                 logger.info("Current token appears expired or invalid. Attempting to exchange temporary token for a long-lived token.")
-                new_token = exchange_for_long_lived_token(temp_token, app_id, app_secret)
+                new_token = _refresh_instagram_token(temp_token, app_id, app_secret)
                 if new_token:
-                    # Update the credentials file with the new long-lived token
-                    credentials = load_instagram_credentials()
-                    credentials["Instagram_AccessToken"] = new_token
-                    save_instagram_credentials(credentials)
                     token = new_token
                     # Retry creating media container
                     r = create_media_container(token)
@@ -390,32 +740,108 @@ def upload_instagram(video_path, caption="My Instagram Post"):
                 logger.error("Error creating Instagram media container after token refresh: %s", r.text)
                 return None
 
-        creation_response = r.json()
+        creation_response = _response_json(r)
         creation_id = creation_response.get("id")
         if not creation_id:
             logger.error("No creation ID returned from Instagram: %s", creation_response)
             return None
 
-        # Step 2: Publish the media container
+        # Prepare the publish request before waiting so it fires the moment
+        # the container flips to FINISHED.
         publish_url = f"https://graph.facebook.com/v18.0/{business_id}/media_publish"
         publish_payload = {
             "creation_id": creation_id,
             "access_token": token
         }
+
+        # Wait for Instagram to finish processing the container; publishing
+        # too early is the usual cause of flaky IG uploads.
+        if _wait_for_container(creation_id, token) == "ERROR":
+            return None
+
+        # Step 2: Publish the media container
         logger.info("Publishing Instagram media...")
-        r_publish = requests.post(publish_url, data=publish_payload)
+        r_publish = _FB_SESSION.post(publish_url, data=publish_payload, timeout=_FB_TIMEOUT)
         if r_publish.status_code != 200:
             handle_instagram_error(r_publish)
             logger.error("Error publishing Instagram media: %s", r_publish.text)
             return None
-        publish_response = r_publish.json()
+        publish_response = _response_json(r_publish)
         instagram_post_id = publish_response.get("id")
         if instagram_post_id:
             logger.info("Instagram video uploaded successfully! Post ID: %s", instagram_post_id)
+            _record_uploaded_id(video_path, "instagram", instagram_post_id)
             return instagram_post_id
         else:
             logger.error("Instagram upload failed, no post ID returned.")
             return None
-    except Exception as e:
-        logger.exception("Error uploading to Instagram: %s", e)
+    except Exception:
+        logger.exception("Error uploading to Instagram")
         return None
+
+#####################################
+# Async / Background Entry Points
+#####################################
+
+async def upload_video_async(video_path, **kwargs):
+    """Runs upload_video in a worker thread so callers can overlap uploads."""
+    return await asyncio.to_thread(upload_video, video_path, **kwargs)
+
+async def upload_instagram_async(video_path, **kwargs):
+    """Runs upload_instagram in a worker thread so callers can overlap uploads."""
+    return await asyncio.to_thread(upload_instagram, video_path, **kwargs)
+
+async def upload_to_cloudinary_async(video_path):
+    """
+    Runs upload_to_cloudinary in a worker thread. Note that within one
+    upload the chunks must stay sequential — both the YouTube resumable
+    protocol and Cloudinary's chunked endpoint order chunks by
+    Content-Range and reject out-of-order ranges — so the concurrency
+    win comes from overlapping whole uploads, not from parallel chunks.
+    """
+    return await asyncio.to_thread(upload_to_cloudinary, video_path)
+
+class BackgroundUploader:
+    """
+    Daemon worker draining a queue of upload jobs, so a caller can enqueue a
+    backlog of uploads and keep working; the YouTube, Instagram and
+    Cloudinary I/O then overlaps naturally with whatever the caller does
+    next. Each enqueue returns a concurrent.futures.Future resolving to the
+    upload function's return value.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                break
+            func, args, kwargs, future = job
+            if not future.set_running_or_notify_cancel():
+                self._queue.task_done()
+                continue
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    def enqueue(self, func, *args, **kwargs):
+        """Queues func(*args, **kwargs); returns a Future with its result."""
+        future = Future()
+        self._queue.put((func, args, kwargs, future))
+        return future
+
+    def join(self):
+        """Blocks until every queued upload has finished."""
+        self._queue.join()
+
+    def close(self):
+        """Stops the worker after the jobs already queued have drained."""
+        self._queue.put(None)
@@ -1,67 +1,140 @@
 import os
-import time
 import shutil
 import sys
+import random
+import asyncio
 from app.logger import get_logger
-from app.scraper import extract_video_id
-from app.stats import get_video_stats, is_viral, get_video_metadata, save_video_metadata
+from app.scraper import extract_video_id, match_video_id
+from app.stats import get_videos_bulk, is_viral, get_video_metadata, save_video_metadata
 from app.downloader import download_video
 from app.editor import add_feedback_template
-from app.uploader import upload_video  # YouTube upload function
+from app.uploader import upload_video_async, upload_instagram_async
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.action_chains import ActionChains
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
 
 logger = get_logger("Main")
 
-def run_process():
-    logger.info("Starting video automation process")
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--window-size=1920,1080")
-    driver = webdriver.Chrome(options=chrome_options)
-    action = ActionChains(driver)
+async def _run_uploads(video_path, upload_youtube=True, upload_instagram=True):
+    """
+    Uploads the video to the enabled platforms concurrently and returns a
+    dict of platform -> upload ID (or None on failure). The YouTube and
+    Instagram/Cloudinary uploads hit independent services, so overlapping
+    them cuts the upload phase to roughly the slower of the two.
+    """
+    tasks = {}
+    if upload_youtube:
+        tasks["youtube"] = asyncio.create_task(upload_video_async(video_path))
+    if upload_instagram:
+        tasks["instagram"] = asyncio.create_task(upload_instagram_async(video_path))
+    results = await asyncio.gather(*tasks.values())
+    return dict(zip(tasks.keys(), results))
+
+def _move_file(src, dst):
+    """Renames src to dst (inode-only on one filesystem); falls back to
+    shutil.move for cross-filesystem targets."""
+    try:
+        os.rename(src, dst)
+    except OSError:
+        shutil.move(src, dst)
+
+def _load_next_short(driver, url, timeout=5):
+    """
+    Navigates to the Shorts feed and returns the short's video ID as soon as
+    the redirected URL carries one, instead of sleeping a fixed worst-case
+    interval. Returns None if the page does not settle within timeout.
+    """
+    driver.get(url)
+    try:
+        # Match quietly inside the poll; extract_video_id logs on every
+        # call, which would spew an ERROR line per 0.5 s poll tick.
+        WebDriverWait(driver, timeout).until(
+            lambda d: match_video_id(d.current_url) is not None
+        )
+    except TimeoutException:
+        return None
+    return extract_video_id(driver.current_url)
+
+def _scan_processed_ids():
+    """
+    One directory scan replaces two stat syscalls per attempt; membership
+    is O(1) no matter how many videos are already on disk.
+    """
+    processed_ids = set()
+    for folder in ("downloads", "shorts"):
+        try:
+            processed_ids.update(
+                # Sidecars are written as edited_<id>.json; strip the prefix
+                # so membership tests work on bare video IDs.
+                os.path.splitext(entry.name)[0].removeprefix("edited_")
+                for entry in os.scandir(folder)
+                if entry.name.endswith(".json")
+            )
+        except FileNotFoundError:
+            pass
+    return processed_ids
+
+def find_viral_video(driver, processed_ids):
+    """
+    Scrapes the Shorts feed until a viral, not-yet-processed video turns up.
+    Returns (video_id, metadata) or None after max_attempts. The chosen ID
+    is added to processed_ids immediately so an overlapped scrape can never
+    pick it a second time while it is still being processed.
+    """
     base_url = "https://www.youtube.com/shorts/"
     logger.info("Opening URL: %s", base_url)
-    driver.get(base_url)
-    time.sleep(5)
     max_attempts = 50
+    batch_size = 10
     attempts = 0
     video_id = None
+    metadata = None
 
-    while attempts < max_attempts:
-        attempts += 1
-        current_url = driver.current_url
-        video_id = extract_video_id(current_url)
-        if not video_id:
-            logger.error("No video ID found. Attempt %d of %d", attempts, max_attempts)
-            driver.get(base_url)
-            time.sleep(5)
-            continue
+    # Collect candidate IDs from the feed first, then resolve their stats in
+    # one batched videos.list call per group, instead of one Data-API round
+    # trip per candidate.
+    while attempts < max_attempts and video_id is None:
+        candidate_ids = []
+        while len(candidate_ids) < batch_size and attempts < max_attempts:
+            attempts += 1
+            candidate = _load_next_short(driver, base_url)
+            if not candidate:
+                logger.error("No video ID found. Attempt %d of %d", attempts, max_attempts)
+                continue
+
+            # Skip if video was already processed (exists in downloads or shorts)
+            if candidate in processed_ids:
+                logger.info("Video %s already processed. Skipping.", candidate)
+                continue
+            if candidate not in candidate_ids:
+                candidate_ids.append(candidate)
 
-        # Skip if video was already processed (exists in downloads or shorts)
-        if os.path.exists(os.path.join("downloads", f"{video_id}.json")) or os.path.exists(os.path.join("shorts", f"{video_id}.json")):
-            logger.info("Video %s already processed. Skipping.", video_id)
-            driver.get(base_url)
-            time.sleep(5)
+        if not candidate_ids:
             continue
+        results = get_videos_bulk(candidate_ids)
+        for candidate in candidate_ids:
+            info = results.get(candidate)
+            stats = info["stats"] if info else None
+            if is_viral(stats):
+                logger.info("Found viral video: %s (Stats: %s)", candidate, stats)
+                video_id = candidate
+                metadata = info["metadata"]
+                break
+            logger.info("Video %s is not viral: %s", candidate, stats)
 
-        stats = get_video_stats(video_id)
-        if is_viral(stats):
-            logger.info("Found viral video: %s (Stats: %s)", video_id, stats)
-            break
-        else:
-            logger.info("Video %s is not viral: %s (Attempt %d of %d)", video_id, stats, attempts, max_attempts)
-            driver.get(base_url)
-            time.sleep(5)
-    else:
+    if video_id is None:
         logger.error("No viral video found after %d attempts. Exiting.", max_attempts)
-        driver.quit()
-        return False
+        return None
 
-    driver.quit()
+    processed_ids.add(video_id)
+    return video_id, metadata
 
+def process_video(video_id, metadata):
+    """
+    Downloads, edits, uploads and archives one viral video. Runs
+    independently of the scraper, so the next scrape can overlap with this
+    work. Returns True on success.
+    """
     downloaded_video_path = download_video(
         video_id,
         output_folder="downloads",
@@ -73,57 +146,97 @@ def run_process():
         logger.error("Failed to download video. Exiting process.")
         return False
 
-    metadata = get_video_metadata(video_id)
+    edited_video_path = os.path.join("downloads", f"edited_{os.path.basename(downloaded_video_path)}")
+    edited_metadata_file = os.path.splitext(edited_video_path)[0] + ".json"
+
+    if metadata is None:
+        # Normally captured from the bulk lookup above; refetch only if not.
+        metadata = get_video_metadata(video_id)
     if metadata:
-        save_video_metadata(video_id, metadata, output_dir=os.path.dirname(downloaded_video_path))
+        # Write the sidecar directly where the uploader will look for it,
+        # instead of writing downloads/<id>.json and copying it over.
+        save_video_metadata(video_id, metadata, output_path=edited_metadata_file)
     else:
-        logger.error("Failed to fetch metadata for video %s", video_id)
+        logger.warning("Failed to fetch metadata for video %s; uploader will use default metadata.", video_id)
 
-    edited_video_path = os.path.join("downloads", f"edited_{os.path.basename(downloaded_video_path)}")
     if not add_feedback_template(downloaded_video_path, edited_video_path):
         logger.error("Failed to edit video. Exiting process.")
         return False
 
-    original_metadata_file = os.path.join(os.path.dirname(downloaded_video_path), f"{video_id}.json")
-    edited_metadata_file = os.path.splitext(edited_video_path)[0] + ".json"
-    if os.path.exists(original_metadata_file):
-        shutil.copy(original_metadata_file, edited_metadata_file)
-        logger.info("Copied metadata file to %s", edited_metadata_file)
-    else:
-        logger.warning("Original metadata file not found; uploader will use default metadata.")
-
-    # Upload to YouTube and Instagram based on flags
-    uploaded_video = None
-    uploaded_instagram = None
-
-    # Import the new Instagram uploader function from uploader
-    from app.uploader import upload_instagram
-
-    if globals().get("UPLOAD_YOUTUBE", True):
-        uploaded_video = upload_video(edited_video_path)
-        if not uploaded_video:
-            logger.error("Failed to upload video to YouTube. Exiting process.")
-            return False
-
-    if globals().get("UPLOAD_INSTAGRAM", True):
-        uploaded_instagram = upload_instagram(edited_video_path)
-        if not uploaded_instagram:
-            logger.error("Failed to upload video to Instagram. Exiting process.")
-            return False
+    # Upload to YouTube and Instagram based on flags. Both uploads are
+    # network-bound against independent services, so run them concurrently.
+    results = asyncio.run(_run_uploads(
+        edited_video_path,
+        upload_youtube=globals().get("UPLOAD_YOUTUBE", True),
+        upload_instagram=globals().get("UPLOAD_INSTAGRAM", True),
+    ))
+    if "youtube" in results and not results["youtube"]:
+        logger.error("Failed to upload video to YouTube. Exiting process.")
+        return False
+    if "instagram" in results and not results["instagram"]:
+        logger.error("Failed to upload video to Instagram. Exiting process.")
+        return False
 
     logger.info("Video uploaded successfully. Moving video and metadata to shorts folder.")
-    shorts_folder = "shorts"
-    os.makedirs(shorts_folder, exist_ok=True)
+    shorts_folder = "shorts"  # created once in main(), before the pipeline
     edited_video_name = os.path.basename(edited_video_path)
     target_video_path = os.path.join(shorts_folder, edited_video_name)
-    shutil.move(edited_video_path, target_video_path)
+    _move_file(edited_video_path, target_video_path)
     metadata_file = os.path.splitext(edited_video_path)[0] + ".json"
     if os.path.exists(metadata_file):
         target_metadata_file = os.path.join(shorts_folder, os.path.basename(metadata_file))
-        shutil.move(metadata_file, target_metadata_file)
+        _move_file(metadata_file, target_metadata_file)
     logger.info("Process completed successfully.")
     return True
 
+def _reset_browser(driver):
+    """Keeps iterations deterministic without paying a full Chrome restart."""
+    driver.delete_all_cookies()
+    try:
+        driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+    except Exception:
+        pass
+
+async def _pipeline(driver, run_count):
+    """
+    Two-stage pipeline: the scraper hunts for the next viral video while the
+    previous one is still downloading, editing and uploading. Scraping is
+    bound on Chrome and the Data API; processing on disk, ffmpeg and
+    outbound bandwidth — disjoint resources, so overlapping them cuts a run
+    to roughly max(t_scrape, t_process) per video.
+    """
+    work = asyncio.Queue(maxsize=2)
+    processed_ids = _scan_processed_ids()
+
+    async def scrape_loop():
+        try:
+            for i in range(run_count):
+                logger.info("=== Scraping iteration %d of %d ===", i + 1, run_count)
+                found = await asyncio.to_thread(find_viral_video, driver, processed_ids)
+                if found is None:
+                    logger.error("Scraper found nothing at iteration %d; stopping.", i + 1)
+                    break
+                await work.put(found)
+                # Selenium/CDP round-trips block; keep them off the loop
+                # like the other driver calls.
+                await asyncio.to_thread(_reset_browser, driver)
+                # Short jittered pause between scrapes; the old fixed 5 s
+                # added nothing but wall time.
+                await asyncio.sleep(1 + random.random())
+        finally:
+            await work.put(None)  # tell the consumer to finish up
+
+    async def process_loop():
+        while True:
+            item = await work.get()
+            if item is None:
+                break
+            video_id, metadata = item
+            if not await asyncio.to_thread(process_video, video_id, metadata):
+                logger.error("Processing failed for video %s", video_id)
+
+    await asyncio.gather(scrape_loop(), process_loop())
+
 def main(run_count=1):
     # Add two simple parameters: --no-youtube and --no-instagram.
     global UPLOAD_YOUTUBE, UPLOAD_INSTAGRAM
@@ -135,12 +248,22 @@ def main(run_count=1):
     if "--no-instagram" in sys.argv:
         UPLOAD_INSTAGRAM = False
 
-    for i in range(run_count):
-        logger.info("=== Starting iteration %d of %d ===", i+1, run_count)
-        if not run_process():
-            logger.error("Process failed at iteration %d", i+1)
-            break
-        time.sleep(5)
+    # Create the working folders once up front instead of re-checking them
+    # on every iteration.
+    os.makedirs("downloads", exist_ok=True)
+    os.makedirs("shorts", exist_ok=True)
+
+    # One Chrome for the whole run: each cold start costs seconds of process
+    # and profile setup, so reuse the browser and just reset its state
+    # between iterations.
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--window-size=1920,1080")
+    driver = webdriver.Chrome(options=chrome_options)
+    try:
+        asyncio.run(_pipeline(driver, run_count))
+    finally:
+        driver.quit()
 
 if __name__ == "__main__":
     try: